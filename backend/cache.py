@@ -0,0 +1,58 @@
+"""Optional Redis cache shared by every worker and container
+
+Set REDIS_URL to enable it; without it get_or_set simply computes the value.
+"""
+import logging
+import os
+import pickle
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+_redis = None
+_stats = Counter()  # hits / misses / errors since this worker started
+if REDIS_URL:
+    import redis.asyncio as redis  # Only needed when a Redis server is configured
+    _redis = redis.from_url(REDIS_URL)
+
+async def get_or_set(key, ttl, compute):
+    """Return the cached value for key, otherwise await compute() and store its result for ttl seconds
+
+    A None result is returned without being stored, and exceptions from compute()
+    propagate uncached. Redis errors are logged and treated as misses so the cache can
+    never fail a request.
+    """
+    if _redis is None:
+        return await compute()
+
+    try:
+        cached = await _redis.get(key)
+        if cached is not None:
+            _stats["hits"] += 1
+            logger.info("Using shared cache entry %s", key)
+            return pickle.loads(cached)
+        _stats["misses"] += 1
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning("Shared cache read failed for %s: %s", key, e)
+
+    value = await compute()
+    if value is None:
+        return None
+    try:
+        await _redis.set(key, pickle.dumps(value), ex=ttl)
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning("Shared cache write failed for %s: %s", key, e)
+    return value
+
+def get_stats():
+    """Return whether Redis is configured and this worker's hit, miss and error counts"""
+    return {"enabled": _redis is not None, "hits": _stats["hits"], "misses": _stats["misses"], "errors": _stats["errors"]}
+
+async def close():
+    """Close the Redis connection pool, if one was opened"""
+    if _redis is not None:
+        await _redis.aclose()
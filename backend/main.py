@@ -1,22 +1,53 @@
-from fastapi import FastAPI, Form, HTTPException
+from fastapi import BackgroundTasks, FastAPI, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import AfterValidator, BaseModel
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Annotated
+import asyncio
+import functools
+import hashlib
+import itertools
 import logging
 import os
+import random
+import re
+import sys
+import textwrap
+import threading
+import time
 from dotenv import load_dotenv
 import uuid
-import requests
-import yt_dlp
-import json
-import google.generativeai as genai
+import orjson
+import httpx
 import assemblyai as aai
+from cachetools import TTLCache
+import diskcache
+import cache as shared_cache
+import metrics
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 load_dotenv()
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
+# LOG_LEVEL=WARNING in production skips formatting of the per-request info logs
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
+def normalize_speech_model(value):
+    """Return AssemblyAI's name for a speech model, case-insensitively; unknown names get nano"""
+    try:
+        return aai.SpeechModel(value.lower()).value
+    except ValueError:
+        return aai.SpeechModel.nano.value
+
+# Normalized on parsing, so cache keys and responses only ever see AssemblyAI's model names
+SpeechModelName = Annotated[str, AfterValidator(normalize_speech_model)]
+
 # Define request model for JSON data
 class VideoRequest(BaseModel):
     url: str
@@ -29,8 +60,82 @@ class EnhancedVideoRequest(BaseModel):
     include_timestamps: bool = True
     include_chapters: bool = True
     include_highlights: bool = True
+    speech_model: SpeechModelName = "nano"  # nano (fast, default) or best (most accurate)
+
+@dataclass(frozen=True)
+class VideoInfo:
+    """Video metadata from the player API or yt-dlp, cached per video ID and shared by every stage of a request"""
+    title: str = 'Unknown Title'
+    description: str = 'No description available'
+    duration: int = 0
+    uploader: str = 'Unknown Uploader'
+    view_count: int = 0
+    like_count: int = 0
+    upload_date: str | None = None  # YYYYMMDD, None when the source doesn't report it
+    categories: tuple = ()
+    tags: tuple = ()
+    channel_url: str = ''
+    is_live: bool = False
+    filesize_approx: int = 0  # Bytes of the chosen audio format, which is all that is ever fetched
+    audio_url: str | None = None  # Direct CDN link AssemblyAI can fetch itself
+    
+    @cached_property
+    def duration_str(self):
+        """Duration as M:SS"""
+        return f"{self.duration // 60}:{self.duration % 60:02d}"
+    
+    @cached_property
+    def upload_date_iso(self):
+        """yt-dlp's YYYYMMDD upload date as YYYY-MM-DD, passing anything else through"""
+        if not self.upload_date:
+            return 'Unknown Date'
+        if len(self.upload_date) == 8:
+            return f"{self.upload_date[0:4]}-{self.upload_date[4:6]}-{self.upload_date[6:8]}"
+        return self.upload_date
+
+@dataclass(frozen=True)
+class TranscriptData:
+    """AssemblyAI output used to build summaries, cached per video ID and transcription options"""
+    text: str = ''
+    summary: str | None = None  # We'll generate this with Gemini instead
+    chapters: list = field(default_factory=list)
+    auto_highlights: object = None
+    entities: list = field(default_factory=list)
+    sentiment_analysis: list = field(default_factory=list)
+    words: list = field(default_factory=list)  # For detailed timestamps
+
+# Request model for several summary styles of the same video in one call
+class MultiSummaryRequest(BaseModel):
+    url: str
+    summary_types: list[str] = ["brief", "comprehensive"]
+    include_timestamps: bool = True
+    include_chapters: bool = True
+    include_highlights: bool = True
+    speech_model: SpeechModelName = "nano"
 
-app = FastAPI()
+class BatchSummaryRequest(BaseModel):
+    requests: list[EnhancedVideoRequest]
+
+# Shared pool for blocking yt-dlp / AssemblyAI / Gemini calls so they don't pin the event loop
+EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("SCRIPTIFY_WORKERS", "8")))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled HTTP/2 client for direct REST calls, so connections are reused across requests
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=60.0,
+        limits=httpx.Limits(max_connections=200),
+    )
+    yield
+    await app.state.http.aclose()
+    # Let in-flight jobs finish before the worker exits
+    EXECUTOR.shutdown(wait=True)
+    SUMMARY_DISK_CACHE.close()
+    await shared_cache.close()
+
+# orjson serializes the large transcript/summary payloads much faster than stdlib json
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Configure CORS - in production, restrict this to specific origins
 app.add_middleware(
@@ -45,9 +150,171 @@ app.add_middleware(
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")  # For enhanced transcript formatting
 ASSEMBLYAI_API_KEY = os.getenv("ASSEMBLYAI_API_KEY", "fd4536c52e784a27904d197e965906cf")  # For actual transcription
 
-# Configure the APIs
-genai.configure(api_key=GEMINI_API_KEY)
-aai.settings.api_key = ASSEMBLYAI_API_KEY
+# Comma-separated ASSEMBLYAI_KEYS spreads jobs across several accounts' concurrency limits
+ASSEMBLYAI_KEYS = [key.strip() for key in os.getenv("ASSEMBLYAI_KEYS", ASSEMBLYAI_API_KEY).split(",") if key.strip()]
+AAI_CLIENTS = [aai.Client(settings=aai.Settings(api_key=key)) for key in ASSEMBLYAI_KEYS]
+_AAI_CLIENT_CYCLE = itertools.cycle(AAI_CLIENTS)
+
+# Each key gets one reusable Transcriber; per-request options are passed as a config on submit
+AAI_TRANSCRIBERS = {client.settings.api_key: aai.Transcriber(client=client) for client in AAI_CLIENTS}
+
+def transcription_options(request):
+    """Return the request options that change AssemblyAI's output, as a hashable tuple"""
+    return (request.speech_model, request.include_highlights)
+
+@functools.lru_cache(maxsize=None)
+def build_aai_config(speech_model, include_highlights):
+    """Build the AssemblyAI config for one combination of transcription options
+    
+    Each audio intelligence feature adds processing time, so only the ones a summary
+    will actually use are requested.
+    """
+    return aai.TranscriptionConfig(
+        speech_model=aai.SpeechModel(speech_model),
+        punctuate=True,
+        format_text=True,
+        disfluencies=False,
+        auto_highlights=include_highlights,
+        # Nothing downstream reads chapters, speakers, entities or sentiment
+        auto_chapters=False,
+        speaker_labels=False,
+        entity_detection=False,
+        sentiment_analysis=False,
+    )
+
+def next_assemblyai_client():
+    """Pick the AssemblyAI client for the next job, round-robin over the configured keys"""
+    return next(_AAI_CLIENT_CYCLE)
+
+ASSEMBLYAI_UPLOAD_URL = "https://api.assemblyai.com/v2/upload"
+ASSEMBLYAI_POLL_INTERVAL = float(os.getenv("ASSEMBLYAI_POLL_INTERVAL", "3"))  # Seconds between status checks
+# Caps jobs in flight per worker so bursts queue here instead of hitting AssemblyAI's concurrency limit
+ASSEMBLYAI_SEMAPHORE = asyncio.Semaphore(int(os.getenv("ASSEMBLYAI_MAX_CONCURRENCY", "16")))
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MB pieces piped from yt-dlp to the upload request
+
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-flash")
+GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "1500"))
+# JSON summaries spend tokens on keys and quoting, and a cut-off object can't be parsed at all
+GEMINI_JSON_MAX_OUTPUT_TOKENS = int(os.getenv("GEMINI_JSON_MAX_OUTPUT_TOKENS", "4096"))
+# Caps Gemini calls in flight per worker so a burst of summaries can't trip its rate limit
+GEMINI_SEMAPHORE = asyncio.Semaphore(int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")))
+
+# Gemini is called over REST on the shared HTTP client rather than through its SDK
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:{method}"
+GEMINI_GENERATION_CONFIG = {
+    "maxOutputTokens": GEMINI_MAX_OUTPUT_TOKENS,  # Bounds generation time and cost
+    "temperature": 0.7,
+    "candidateCount": 1,
+}
+# Buffered summaries come back as JSON in this shape and are rendered to markdown here,
+# so Gemini spends no output tokens on formatting and nothing has to be re-parsed from prose
+SUMMARY_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "executive_summary": {"type": "STRING"},
+        "takeaways": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "sections": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "title": {"type": "STRING"},
+                    "timestamp": {"type": "STRING"},
+                    "content": {"type": "STRING"},
+                },
+                "required": ["title", "content"],
+            },
+        },
+        "action_items": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["executive_summary", "takeaways", "sections", "action_items"],
+}
+SUMMARY_JSON_CONFIG = {
+    "maxOutputTokens": GEMINI_JSON_MAX_OUTPUT_TOKENS,
+    "responseMimeType": "application/json",
+    "responseSchema": SUMMARY_SCHEMA,
+    "temperature": 0.3,
+}
+
+# Caches keyed by the 11-character YouTube video ID
+# yt-dlp metadata (including the direct audio URL, which YouTube expires after ~6 hours)
+VIDEO_INFO_CACHE = TTLCache(
+    maxsize=int(os.getenv("VIDEO_INFO_CACHE_SIZE", "2000")),
+    ttl=int(os.getenv("VIDEO_INFO_CACHE_TTL", "3600")),
+)
+SUMMARY_CACHE = TTLCache(maxsize=512, ttl=86400)  # Finished summary responses, 1 day
+TRANSCRIPT_CACHE = TTLCache(maxsize=256, ttl=86400)  # AssemblyAI results by video ID and transcription options
+# Generated summaries keyed by transcript hash; on disk so restarts and all workers share them
+SUMMARY_DISK_CACHE = diskcache.Cache(os.getenv("SUMMARY_CACHE_DIR", os.path.abspath("cache")))
+SUMMARY_DISK_CACHE_TTL = 7 * 86400
+TRANSCRIPT_SHARED_TTL = 30 * 86400  # Transcripts in the optional Redis cache; a video's audio never changes
+_VIDEO_INFO_LOCK = threading.Lock()  # extract_video_info runs on executor threads
+_SUMMARY_LOCKS = {}  # Per-key asyncio locks so duplicate requests share one pipeline run
+_TRANSCRIPT_TASKS = {}  # In-flight transcriptions by transcript cache key, awaited by every duplicate
+_CONDENSE_TASKS = {}  # In-flight map phases by transcript hash, shared by every style being summarized
+CACHE_STATS = Counter()  # "<cache>_hits" / "<cache>_misses" per cache layer, served by /cache/stats
+
+# Limits on metadata copied from yt-dlp
+MAX_DESCRIPTION_CHARS = 1500
+MAX_TAGS = 10
+MAX_CATEGORIES = 5
+
+# Videos beyond these are rejected from metadata alone, before any audio is fetched or billed
+MAX_DURATION_S = int(os.getenv("MAX_DURATION_S", "7200"))
+MAX_SIZE_B = int(os.getenv("MAX_SIZE_B", "500000000"))
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10"))  # Videos per /transcribe-summary/batch/ call
+
+class _YdlLogger:
+    """Drop yt-dlp's progress and info chatter but keep its errors in our log"""
+    def debug(self, msg):
+        pass
+
+    def info(self, msg):
+        pass
+
+    def warning(self, msg):
+        pass
+
+    def error(self, msg):
+        logger.warning("yt-dlp: %s", msg)
+
+# Options shared by every YoutubeDL instance to keep it off stderr
+YDL_QUIET_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'noprogress': True,
+    'logger': _YdlLogger(),
+}
+
+# Downloads are kept here by video ID; resolved and created once at startup
+AUDIO_DIR = os.path.abspath("audio")
+os.makedirs(AUDIO_DIR, exist_ok=True)
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(2 << 30)))  # Oldest files are evicted past this
+
+# Audio formats tried in order; the m4a variant is a fallback when the first yields nothing
+AUDIO_FORMATS = ['bestaudio/best', 'bestaudio[ext=m4a]/bestaudio']
+
+# Substrings of yt-dlp errors mapped to the status and message reported to the client
+YDL_ERROR_MAP = (
+    (('requested format',), 422, "No downloadable audio format is available for this video"),
+    (('age', 'restrict'), 403, "The video is age-restricted and requires authentication"),
+    (('private',), 403, "The video is private and cannot be accessed"),
+    (('available', 'exist'), 404, "The video is unavailable or does not exist"),
+)
+
+# AssemblyAI error fragments meaning it could not fetch a direct audio URL
+AUDIO_FETCH_ERROR_MARKERS = ('download', 'access', 'forbidden', '403', 'expired')
+
+# YouTube's internal player API; one request returns metadata and plain stream URLs for most videos
+INNERTUBE_PLAYER_URL = "https://www.youtube.com/youtubei/v1/player"
+# The iOS client is still served unciphered stream URLs, unlike WEB
+INNERTUBE_CONTEXT = {"client": {"clientName": "IOS", "clientVersion": "19.45.4", "deviceModel": "iPhone16,2", "hl": "en"}}
+INNERTUBE_USER_AGENT = "com.google.ios.youtube/19.45.4 (iPhone16,2; U; CPU iOS 18_1_0 like Mac OS X;)"
+
+# Only watch / shorts / embed / youtu.be links with a well-formed video ID are accepted
+_YT_URL_RE = re.compile(r'^https?://(?:www\.|m\.)?(?:youtube\.com/(?:watch\?(?:[^#]*&)?v=|shorts/|embed/)|youtu\.be/)[A-Za-z0-9_-]{11}(?![A-Za-z0-9_-])', re.I)
+_VIDEO_ID_RE = re.compile(r'(?:youtu\.be/|/shorts/|/embed/|[?&]v=)([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])', re.I)
 
 # Basic test endpoint
 @app.get("/")
@@ -64,164 +331,557 @@ async def test_endpoint():
 async def echo_endpoint(request: VideoRequest):
     return {"received_url": request.url}
 
-def download_audio_and_get_info(url, output_folder="audio"):
-    """Download audio from YouTube URL and extract video information"""
+def _is_retryable(error):
+    """Only rate limits (429) and server errors (5xx) are worth retrying"""
+    response = getattr(error, 'response', None)
+    for status in (getattr(error, 'status_code', None), getattr(response, 'status_code', None), getattr(error, 'code', None)):
+        if isinstance(status, int):
+            return status == 429 or status >= 500
+    return False
+
+def retry_external(max_attempts=5, base=1.0, max_delay=30.0):
+    """Retry an external API call on 429/5xx with exponential backoff and jitter
+    
+    Wraps blocking functions and coroutine functions alike; coroutines back off with
+    asyncio.sleep so the event loop keeps running.
+    """
+    def decorator(func):
+        def backoff(attempt, error):
+            """Return the delay before the next attempt, or None if the error should propagate"""
+            if attempt == max_attempts - 1 or not _is_retryable(error):
+                return None
+            delay = min(base * 2 ** attempt + random.uniform(0, base), max_delay)
+            logger.warning("%s failed (%s), retrying in %.1fs", func.__name__, error, delay)
+            return delay
+        
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                for attempt in range(max_attempts):
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        delay = backoff(attempt, e)
+                        if delay is None:
+                            raise
+                        await asyncio.sleep(delay)
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(max_attempts):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    delay = backoff(attempt, e)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+        return wrapper
+    return decorator
+
+def gemini_request(prompt, generation_config=None):
+    """Build a generateContent request body for a single-turn prompt"""
+    return {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": {**GEMINI_GENERATION_CONFIG, **(generation_config or {})},
+    }
+
+def gemini_text(payload):
+    """Join the text parts of the first candidate in a Gemini response or stream chunk"""
+    candidates = payload.get("candidates") or []
+    if not candidates:
+        return ""
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    return "".join(part.get("text", "") for part in parts)
+
+def gemini_finish_reason(payload):
+    """Return why Gemini stopped generating the first candidate, e.g. STOP or MAX_TOKENS"""
+    candidates = payload.get("candidates") or []
+    return candidates[0].get("finishReason") if candidates else None
+
+@retry_external()
+async def generate_with_gemini(prompt, generation_config=None, require_complete=False):
+    """Generate text with Gemini on the shared HTTP client, retrying transient failures
+    
+    With require_complete, output cut off at maxOutputTokens raises ValueError instead
+    of being returned, for callers that can't use a partial response.
+    """
+    async with GEMINI_SEMAPHORE:
+        with metrics.GEMINI_LATENCY.labels("generateContent").time():
+            try:
+                response = await app.state.http.post(
+                    GEMINI_API_URL.format(model=GEMINI_MODEL_NAME, method="generateContent"),
+                    headers={"x-goog-api-key": GEMINI_API_KEY},
+                    json=gemini_request(prompt, generation_config),
+                )
+            except httpx.TransportError:
+                metrics.GEMINI_REQUESTS.labels("generateContent", "error").inc()
+                raise
+    metrics.GEMINI_REQUESTS.labels("generateContent", str(response.status_code)).inc()
+    response.raise_for_status()
+    payload = response.json()
+    metrics.record_usage(payload.get("usageMetadata"))
+    if require_complete and gemini_finish_reason(payload) == "MAX_TOKENS":
+        raise ValueError("Gemini output was cut off at maxOutputTokens")
+    return gemini_text(payload)
+
+async def stream_with_gemini(prompt, generation_config=None):
+    """Yield (text, finish_reason) pairs as Gemini generates, using the SSE form of streamGenerateContent
+    
+    finish_reason is None until the last chunk, which carries STOP, MAX_TOKENS or the
+    like. A task reads the response into a queue, so GEMINI_SEMAPHORE is held only while Gemini
+    is producing and never while a slow client reads what was already generated. The
+    request is counted once it ends, under "error" if the connection failed before or
+    during the response.
+    """
+    queue = asyncio.Queue()  # Unbounded; a whole summary is a few KB
+    
+    async def produce():
+        status = "error"
+        usage = None
+        try:
+            async with GEMINI_SEMAPHORE:
+                # Timed from before the request is sent, so time to first byte is included
+                with metrics.GEMINI_LATENCY.labels("streamGenerateContent").time():
+                    async with app.state.http.stream(
+                        "POST",
+                        GEMINI_API_URL.format(model=GEMINI_MODEL_NAME, method="streamGenerateContent"),
+                        params={"alt": "sse"},
+                        headers={"x-goog-api-key": GEMINI_API_KEY},
+                        json=gemini_request(prompt, generation_config),
+                    ) as response:
+                        status = str(response.status_code)
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if line.startswith("data:"):
+                                payload = orjson.loads(line[5:])
+                                usage = payload.get("usageMetadata") or usage  # Running totals; the last chunk has the final count
+                                text, finish_reason = gemini_text(payload), gemini_finish_reason(payload)
+                                if text or finish_reason:
+                                    queue.put_nowait((text, finish_reason))
+            metrics.record_usage(usage)
+            queue.put_nowait(None)
+        except Exception as e:
+            if isinstance(e, httpx.TransportError):
+                status = "error"
+            queue.put_nowait(e)  # Re-raised by the reader instead of left on the task
+        finally:
+            metrics.GEMINI_REQUESTS.labels("streamGenerateContent", status).inc()
+    
+    task = asyncio.ensure_future(produce())
     try:
-        logger.info(f"Starting YouTube download and info extraction for URL: {url}")
+        while (item := await queue.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Stops generating if the client went away mid-stream; a no-op once Gemini is done
+        task.cancel()
+
+@retry_external()
+def submit_transcript(transcriber, audio, config):
+    """Submit an AssemblyAI job, retrying transient failures"""
+    return transcriber.submit(audio, config=config)
+
+@retry_external()
+def get_transcript_status(client, transcript_id):
+    """Fetch an AssemblyAI job's status with the client that submitted it, retrying transient failures"""
+    response = client.http_client.get(f"/transcript/{transcript_id}")
+    response.raise_for_status()
+    return response.json()["status"]
+
+@retry_external()
+def get_transcript(transcript):
+    """Load a finished AssemblyAI job's full result, retrying transient failures"""
+    return transcript.wait_for_completion()
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking function in the shared executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(EXECUTOR, functools.partial(func, *args, **kwargs))
+
+def extract_video_id(url):
+    """Return the 11-character YouTube video ID in a URL, or None"""
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else None
+
+def canonicalize(url):
+    """Return (video_id, canonical watch URL); unrecognized URLs are passed through unchanged"""
+    video_id = extract_video_id(url)
+    if not video_id:
+        return None, url
+    return video_id, f"https://www.youtube.com/watch?v={video_id}"
+
+def pick_audio_format(info):
+    """Return the highest-bitrate audio-only format with a direct URL, or None"""
+    audio_formats = [
+        f for f in info.get('formats') or []
+        if f.get('acodec') not in (None, 'none') and f.get('vcodec') == 'none'
+        and f.get('protocol') in ('http', 'https') and f.get('url')
+    ]
+    if not audio_formats:
+        return None
+    return max(audio_formats, key=lambda f: f.get('abr') or 0)
+
+_YDL_LOCAL = threading.local()
+
+def _metadata_ydl():
+    """Return this thread's long-lived metadata YoutubeDL, creating it on first use"""
+    # Building a YoutubeDL loads every extractor; YoutubeDL isn't thread-safe, so keep one per executor thread
+    ydl = getattr(_YDL_LOCAL, 'ydl', None)
+    if ydl is None:
+        import yt_dlp  # Imported on first use; it is slow to load
+        ydl = _YDL_LOCAL.ydl = yt_dlp.YoutubeDL({**YDL_QUIET_OPTS, 'skip_download': True})
+    return ydl
+
+def _bounded_description(description):
+    """Shorten a video description to MAX_DESCRIPTION_CHARS so it can't bloat prompts or the cache"""
+    description = description or 'No description available'
+    if len(description) > MAX_DESCRIPTION_CHARS:
+        logger.info("Truncating description from %s to %s characters", len(description), MAX_DESCRIPTION_CHARS)
+        description = textwrap.shorten(description, width=MAX_DESCRIPTION_CHARS, placeholder='…')
+    return description
+
+def extract_video_info(url):
+    """Extract video metadata with yt-dlp without downloading any media"""
+    video_id = extract_video_id(url)
+    with _VIDEO_INFO_LOCK:
+        cached = VIDEO_INFO_CACHE.get(video_id) if video_id else None
+    if cached is not None:
+        logger.info("Using cached video info for %s", video_id)
+        return cached
+    
+    try:
+        logger.info("Extracting video information...")
+        info = _metadata_ydl().extract_info(url, download=False)
         
-        # Fix for YouTube URL formats
-        if 'youtu.be' in url:
-            # Convert youtu.be format to full youtube.com format
-            video_id = url.split('/')[-1].split('?')[0]
-            url = f"https://www.youtube.com/watch?v={video_id}"
-        elif '&' in url:
-            # Remove everything after &
-            url = url.split('&')[0]
-            
-        logger.info(f"Processed URL: {url}")
+        # Size the audio we'd fetch, not the top-level size of the merged video+audio format
+        audio = pick_audio_format(info) or {}
         
-        # Create output folder if it doesn't exist
-        os.makedirs(output_folder, exist_ok=True)
+        # Extract useful metadata
+        video_info = VideoInfo(
+            title=info.get('title', 'Unknown Title'),
+            description=_bounded_description(info.get('description')),
+            duration=int(info.get('duration') or 0),
+            uploader=info.get('uploader', 'Unknown Uploader'),
+            view_count=info.get('view_count') or 0,
+            like_count=info.get('like_count') or 0,
+            upload_date=info.get('upload_date'),
+            categories=tuple((info.get('categories') or [])[:MAX_CATEGORIES]),
+            tags=tuple((info.get('tags') or [])[:MAX_TAGS]),
+            channel_url=info.get('channel_url', ''),
+            is_live=bool(info.get('is_live')),
+            filesize_approx=audio.get('filesize') or audio.get('filesize_approx') or 0,
+            audio_url=audio.get('url'),
+        )
+        logger.info("Video info extracted: %s", video_info.title)
         
-        # Ensure output folder is absolute path
-        output_folder = os.path.abspath(output_folder)
-            
-        # Generate unique filename
-        filename = f"{uuid.uuid4()}.mp3"  # Use mp3 format
-        file_path = os.path.join(output_folder, filename)
+        if video_id:
+            with _VIDEO_INFO_LOCK:
+                VIDEO_INFO_CACHE[video_id] = video_info
+        return video_info
+    except Exception as e:
+        logger.error("Error extracting video information: %s", e)
+        return VideoInfo(title='Unknown', description='Failed to extract video information')
+
+async def fetch_player_response(video_id):
+    """Build video_info from a single innertube player request instead of a yt-dlp extraction
+    
+    Returns None when YouTube withholds plain audio URLs (signature cipher, login or age
+    gates), leaving those videos to yt-dlp.
+    """
+    response = await app.state.http.post(
+        INNERTUBE_PLAYER_URL,
+        headers={"User-Agent": INNERTUBE_USER_AGENT},
+        json={"videoId": video_id, "context": INNERTUBE_CONTEXT, "contentCheckOk": True, "racyCheckOk": True},
+    )
+    response.raise_for_status()
+    player = response.json()
+    
+    if (player.get('playabilityStatus') or {}).get('status') != 'OK':
+        return None
+    audio_formats = [
+        f for f in (player.get('streamingData') or {}).get('adaptiveFormats') or []
+        if f.get('mimeType', '').startswith('audio/') and f.get('url')
+    ]
+    if not audio_formats:
+        return None
+    audio = max(audio_formats, key=lambda f: f.get('bitrate') or 0)
+    
+    details = player.get('videoDetails') or {}
+    # The microformat block, when a client includes it, carries the ISO upload date;
+    # like_count and categories are not part of the player response
+    microformat = (player.get('microformat') or {}).get('playerMicroformatRenderer') or {}
+    upload_date = microformat.get('uploadDate') or microformat.get('publishDate')
+    return VideoInfo(
+        title=details.get('title', 'Unknown Title'),
+        description=_bounded_description(details.get('shortDescription')),
+        duration=int(details.get('lengthSeconds') or 0),
+        uploader=details.get('author', 'Unknown Uploader'),
+        view_count=int(details.get('viewCount') or 0),
+        upload_date=upload_date[:10].replace('-', '') if upload_date else None,
+        tags=tuple((details.get('keywords') or [])[:MAX_TAGS]),
+        channel_url=f"https://www.youtube.com/channel/{details['channelId']}" if details.get('channelId') else '',
+        is_live=bool(details.get('isLive')),
+        filesize_approx=int(audio.get('contentLength') or 0),
+        audio_url=audio['url'],
+    )
+
+async def get_video_info(url):
+    """Return cached video metadata, else try the innertube player API before falling back to yt-dlp"""
+    video_id = extract_video_id(url)
+    if video_id:
+        with _VIDEO_INFO_LOCK:
+            cached = VIDEO_INFO_CACHE.get(video_id)
+        if cached is not None:
+            CACHE_STATS["video_info_hits"] += 1
+            logger.info("Using cached video info for %s", video_id)
+            return cached
+        CACHE_STATS["video_info_misses"] += 1
         
-        # Extract video information first
-        video_info = {}
         try:
-            with yt_dlp.YoutubeDL({'quiet': False}) as ydl:
-                logger.info("Extracting video information...")
-                info = ydl.extract_info(url, download=False)
+            video_info = await fetch_player_response(video_id)
+        except Exception as e:
+            logger.warning("Innertube player request failed for %s: %s", video_id, e)
+            video_info = None
+        if video_info is not None:
+            logger.info("Video info fetched from the player API: %s", video_info.title)
+            with _VIDEO_INFO_LOCK:
+                VIDEO_INFO_CACHE[video_id] = video_info
+            return video_info
+    
+    return await run_blocking(extract_video_info, url)
+
+async def upload_audio_stream(url, api_key):
+    """Pipe yt-dlp's stdout straight into AssemblyAI's upload endpoint and return the upload URL"""
+    error = "no audio data received"
+    
+    for audio_format in AUDIO_FORMATS:
+        logger.info("Streaming audio to AssemblyAI with format %s...", audio_format)
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, '-m', 'yt_dlp', '--format', audio_format, '--no-playlist',
+            '--quiet', '--no-warnings', '--no-progress', '--output', '-', url,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            first_chunk = await proc.stdout.read(UPLOAD_CHUNK_SIZE)
+            if first_chunk:
+                async def body():
+                    yield first_chunk
+                    while chunk := await proc.stdout.read(UPLOAD_CHUNK_SIZE):
+                        yield chunk
                 
-                # Extract useful metadata
-                video_info = {
-                    'title': info.get('title', 'Unknown Title'),
-                    'description': info.get('description', 'No description available'),
-                    'duration': info.get('duration', 0),
-                    'uploader': info.get('uploader', 'Unknown Uploader'),
-                    'view_count': info.get('view_count', 0),
-                    'like_count': info.get('like_count', 0),
-                    'upload_date': info.get('upload_date', 'Unknown Date'),
-                    'categories': info.get('categories', []),
-                    'tags': info.get('tags', []),
-                    'channel_url': info.get('channel_url', ''),
-                }
-                logger.info(f"Video info extracted: {video_info['title']}")
+                # An async generator body is sent with Transfer-Encoding: chunked
+                response = await app.state.http.post(
+                    ASSEMBLYAI_UPLOAD_URL,
+                    headers={"authorization": api_key},
+                    content=body(),
+                    timeout=300.0,
+                )
+            stderr = await proc.stderr.read()
+            await proc.wait()
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+        
+        # A partial stream from a failed yt-dlp run is discarded
+        if proc.returncode == 0 and first_chunk:
+            response.raise_for_status()
+            logger.info("Audio uploaded to AssemblyAI without touching the disk")
+            return response.json()["upload_url"]
+        error = stderr.decode(errors='replace').strip() or error
+    
+    raise RuntimeError(f"yt-dlp could not stream audio: {error}")
+
+async def upload_audio_file(file_path, api_key):
+    """Stream a downloaded audio file to AssemblyAI's upload endpoint and return the upload URL
+    
+    Only one UPLOAD_CHUNK_SIZE piece is held in memory at a time, unlike the SDK's
+    upload which reads the whole file first.
+    """
+    async def body():
+        with open(file_path, 'rb', buffering=UPLOAD_CHUNK_SIZE) as f:
+            while chunk := await run_blocking(f.read, UPLOAD_CHUNK_SIZE):
+                yield chunk
+    
+    # An async generator body is sent with Transfer-Encoding: chunked
+    response = await app.state.http.post(
+        ASSEMBLYAI_UPLOAD_URL,
+        headers={"authorization": api_key},
+        content=body(),
+        timeout=300.0,
+    )
+    response.raise_for_status()
+    return response.json()["upload_url"]
+
+def _prepare_output_path(output_folder, video_id=None):
+    """Return the path for a video's downloaded audio inside an existing output folder"""
+    return os.path.join(output_folder, f"{video_id or uuid.uuid4()}.mp3")
+
+def _file_ok(file_path):
+    """Return True if file_path exists and is non-empty, using a single stat call"""
+    try:
+        return os.stat(file_path).st_size > 0
+    except OSError:
+        return False
+
+def _cached_audio(file_path):
+    """Return file_path if it holds a previous download, marking it recently used"""
+    if not _file_ok(file_path):
+        return None
+    try:
+        os.utime(file_path)  # mtime orders LRU eviction
+    except OSError:
+        return None
+    return file_path
+
+def evict_audio_cache(output_folder=AUDIO_DIR, max_bytes=AUDIO_CACHE_MAX_BYTES):
+    """Delete the least recently used downloads until the folder fits in max_bytes"""
+    entries = []
+    with os.scandir(output_folder) as it:
+        for entry in it:
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    
+    total = sum(size for _, size, _ in entries)
+    stale = []
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        stale.append(path)
+        total -= size
+    cleanup_files(*stale)
+
+def _download_with_retry(url, file_path):
+    """Download audio to file_path, trying each of AUDIO_FORMATS until one produces data"""
+    import yt_dlp  # Imported on first use; it is slow to load
+    
+    info = None
+    for audio_format in AUDIO_FORMATS:
+        # Simple download configuration without FFmpeg dependency
+        ydl_opts = {
+            **YDL_QUIET_OPTS,
+            'format': audio_format,
+            'outtmpl': file_path,
+            'noplaylist': True,
+        }
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            # Extract once without format selection; every format attempt reuses the same info
+            if info is None:
+                info = ydl.extract_info(url, download=False, process=False)
+            
+            logger.info("Downloading audio with format %s...", audio_format)
+            try:
+                ydl.process_ie_result(info, download=True)
+            except yt_dlp.utils.YoutubeDLError as e:
+                # process_ie_result raises ExtractorError rather than DownloadError here.
+                # Only an unavailable format is worth another attempt; anything else fails fast
+                if 'requested format' not in str(e).lower() or audio_format == AUDIO_FORMATS[-1]:
+                    raise
+                logger.warning("Format %s unavailable: %s", audio_format, e)
+                continue
+        
+        # Verify the file exists and has content
+        if _file_ok(file_path):
+            return file_path
+        logger.warning("Downloaded file missing or empty: %s", file_path)
+    
+    raise HTTPException(status_code=500, detail="Failed to download audio file")
+
+def _map_ydl_error_to_http(error):
+    """Translate a yt-dlp failure into the HTTPException reported to the client"""
+    error_str = str(error).lower()
+    for keywords, status_code, detail in YDL_ERROR_MAP:
+        if any(keyword in error_str for keyword in keywords):
+            return HTTPException(status_code=status_code, detail=detail)
+    return HTTPException(status_code=500, detail=f"Failed to download video: {str(error)}")
+
+async def download_audio(url, api_key, output_folder=AUDIO_DIR):
+    """Download audio from a canonical YouTube URL
+    
+    Returns an AssemblyAI upload URL when the audio could be piped there directly,
+    otherwise the path of the download, which is kept on disk under the video ID.
+    """
+    file_path = _prepare_output_path(output_folder, extract_video_id(url))
+    try:
+        # A previous download of this video is reused instead of fetching it again
+        cached = await run_blocking(_cached_audio, file_path)
+        if cached:
+            logger.info("Using cached audio file: %s", cached)
+            return cached
+        
+        # Prefer piping the audio straight to AssemblyAI so it never touches the disk
+        try:
+            return await upload_audio_stream(url, api_key)
         except Exception as e:
-            logger.error(f"Error extracting video information: {str(e)}")
-            video_info = {'title': 'Unknown', 'description': 'Failed to extract video information'}
+            logger.warning("Streaming upload failed, falling back to a temporary file: %s", e)
         
         # Use yt-dlp to download the audio
         try:
-            # Simple download configuration without FFmpeg dependency
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': file_path,
-                'noplaylist': True,
-                'ignoreerrors': True,
-                'quiet': False,
-                'postprocessors': [],  # No FFmpeg post-processors
-            }
-            
-            # Download the audio
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                logger.info("Downloading audio...")
-                ydl.download([url])
-                
-            # Verify the file exists and has content
-            if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
-                logger.warning(f"Downloaded file missing or empty: {file_path}")
-                # Try with specific audio format
-                ydl_opts_alternate = {
-                    'format': 'bestaudio[ext=m4a]/bestaudio',
-                    'outtmpl': file_path,
-                    'noplaylist': True,
-                    'ignoreerrors': True,
-                    'quiet': False,
-                }
-                
-                with yt_dlp.YoutubeDL(ydl_opts_alternate) as ydl:
-                    logger.info("Trying alternate download method...")
-                    ydl.download([url])
-                
-            # Final check if we have a valid file
-            if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
-                raise HTTPException(status_code=500, detail="Failed to download audio file")
-                
-            logger.info(f"Successfully downloaded audio to: {file_path}")
-            return file_path, video_info
-            
+            file_path = await run_blocking(_download_with_retry, url, file_path)
+            logger.info("Successfully downloaded audio to: %s", file_path)
+            return file_path
         except Exception as e:
-            logger.error(f"Error downloading audio: {str(e)}")
-            # Check for specific error patterns to provide better feedback
-            error_str = str(e).lower()
-            if 'age' in error_str or 'restrict' in error_str:
-                raise HTTPException(status_code=403, detail="The video is age-restricted and requires authentication")
-            elif 'private' in error_str:
-                raise HTTPException(status_code=403, detail="The video is private and cannot be accessed")
-            elif 'available' in error_str or 'exist' in error_str:
-                raise HTTPException(status_code=404, detail="The video is unavailable or does not exist")
-            else:
-                raise HTTPException(status_code=500, detail=f"Failed to download video: {str(e)}")
+            logger.error("Error downloading audio: %s", e)
+            raise _map_ydl_error_to_http(e)
                 
     except HTTPException as http_ex:
         # Re-raise HTTP exceptions as is
         raise http_ex
     except Exception as e:
-        logger.error(f"Unhandled error in download_audio: {str(e)}")
+        logger.error("Unhandled error in download_audio: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to process video: {str(e)}")
 
-def transcribe_with_assemblyai(audio_path):
-    """Transcribe audio file using AssemblyAI API with advanced features"""
+async def transcribe_with_assemblyai(audio_path, client, config):
+    """Transcribe an audio file path or URL using AssemblyAI API with advanced features
+    
+    The job is submitted and then polled from the event loop, so no worker thread is
+    held while AssemblyAI processes the audio.
+    """
     try:
-        logger.info(f"Starting advanced transcription with AssemblyAI for {audio_path}")
+        logger.info("Starting advanced transcription with AssemblyAI for %s", audio_path)
         
-        if not os.path.exists(audio_path):
-            logger.error(f"Audio file not found: {audio_path}")
-            raise HTTPException(status_code=500, detail="Audio file not found")
+        if not audio_path.startswith(('http://', 'https://')):
+            if not _file_ok(audio_path):
+                logger.error("Audio file not found: %s", audio_path)
+                raise HTTPException(status_code=500, detail="Audio file not found")
+            audio_path = await upload_audio_file(audio_path, client.settings.api_key)
         
-        # Configure AssemblyAI with advanced features
-        config = aai.TranscriptionConfig(
-            speech_model=aai.SpeechModel.best,
-            punctuate=True,
-            format_text=True,
-            auto_chapters=True,  # Enable chapter detection
-            speaker_labels=True,  # Enable speaker identification
-            auto_highlights=True,  # Enable key highlights
-            entity_detection=True,  # Enable entity detection
-            sentiment_analysis=True,  # Enable sentiment analysis
-        )
+        # Submit the job, then poll until it finishes
+        transcriber = AAI_TRANSCRIBERS[client.settings.api_key]
+        logger.info("Submitting audio to AssemblyAI with advanced features...")
         
-        # Create transcriber and transcribe the audio file
-        transcriber = aai.Transcriber(config=config)
-        logger.info("Uploading and transcribing audio file with advanced features...")
-        
-        transcript = transcriber.transcribe(audio_path)
+        async with ASSEMBLYAI_SEMAPHORE:
+            transcript = await run_blocking(submit_transcript, transcriber, audio_path, config)
+            status = transcript.status
+            while status not in (aai.TranscriptStatus.completed, aai.TranscriptStatus.error):
+                await asyncio.sleep(ASSEMBLYAI_POLL_INTERVAL)
+                status = await run_blocking(get_transcript_status, client, transcript.id)
+            transcript = await run_blocking(get_transcript, transcript)
         
         # Check if transcription was successful
         if transcript.status == "error":
-            logger.error(f"AssemblyAI transcription failed: {transcript.error}")
+            logger.error("AssemblyAI transcription failed: %s", transcript.error)
             raise HTTPException(status_code=500, detail=f"Transcription failed: {transcript.error}")
         
-        logger.info(f"Advanced transcription complete with {len(transcript.text)} characters")
+        logger.info("Advanced transcription complete with %s characters", len(transcript.text))
         
         # Return structured data instead of just text
-        return {
-            "text": transcript.text,
-            "summary": None,  # We'll generate this with Gemini instead
-            "chapters": getattr(transcript, 'chapters', []),
-            "auto_highlights": getattr(transcript, 'auto_highlights_result', None),
-            "entities": getattr(transcript, 'entities', []),
-            "sentiment_analysis": getattr(transcript, 'sentiment_analysis_results', []),
-            "words": getattr(transcript, 'words', []),  # For detailed timestamps
-        }
+        return TranscriptData(
+            text=transcript.text or '',
+            chapters=getattr(transcript, 'chapters', None) or [],
+            auto_highlights=getattr(transcript, 'auto_highlights_result', None),
+            entities=getattr(transcript, 'entities', None) or [],
+            sentiment_analysis=getattr(transcript, 'sentiment_analysis_results', None) or [],
+            words=getattr(transcript, 'words', None) or [],
+        )
         
     except Exception as e:
-        logger.error(f"Error in transcribe_with_assemblyai: {str(e)}")
+        logger.error("Error in transcribe_with_assemblyai: %s", e)
         if "API key" in str(e).lower():
             raise HTTPException(
                 status_code=500, 
@@ -242,16 +902,11 @@ def create_intelligent_summary(transcript_data, video_info, summary_type, includ
     """Create an intelligent summary using built-in text processing when AI API is not available"""
     
     # Extract text and metadata
-    raw_text = transcript_data.get('text', '') if isinstance(transcript_data, dict) else str(transcript_data)
-    highlights = transcript_data.get('auto_highlights', None) if isinstance(transcript_data, dict) else None
+    raw_text = transcript_data.text
+    highlights = transcript_data.auto_highlights
     
     # Format duration and metadata
-    duration_mins = video_info['duration'] // 60
-    duration_secs = video_info['duration'] % 60
-    
-    upload_date = video_info['upload_date']
-    if len(upload_date) == 8:  # YYYYMMDD format
-        upload_date = f"{upload_date[0:4]}-{upload_date[4:6]}-{upload_date[6:8]}"
+    duration_mins = video_info.duration // 60
     
     # Intelligent content extraction from transcript
     def extract_key_points(text):
@@ -299,67 +954,65 @@ def create_intelligent_summary(transcript_data, video_info, summary_type, includ
     
     # Build summary based on type - simplified without chapters
     if summary_type == "comprehensive":
-        summary = f"""# 🎥 {video_info['title']}
+        summary = f"""# 🎥 {video_info.title}
 
 ## 📹 Video Overview
-- **Creator:** {video_info['uploader']}
-- **Duration:** {duration_mins}:{duration_secs:02d}
-- **Upload Date:** {upload_date}
-- **Views:** {video_info.get('view_count', 'N/A'):,} views
+- **Creator:** {video_info.uploader}
+- **Duration:** {video_info.duration_str}
+- **Upload Date:** {video_info.upload_date_iso}
+- **Views:** {video_info.view_count:,} views
 
 ## 🎯 Key Insights & Takeaways
 
 """
-        for i, point in enumerate(key_points, 1):
-            summary += f"**{i}.** {point}\n\n"
+        summary += "".join(f"**{i}.** {point}\n\n" for i, point in enumerate(key_points, 1))
                 
     elif summary_type == "brief":
-        summary = f"""# 📝 {video_info['title']} - Summary
+        summary = f"""# 📝 {video_info.title} - Summary
 
-**Creator:** {video_info['uploader']} | **Duration:** {duration_mins}:{duration_secs:02d} | **Views:** {video_info.get('view_count', 'N/A'):,}
+**Creator:** {video_info.uploader} | **Duration:** {video_info.duration_str} | **Views:** {video_info.view_count:,}
 
 ## 🔑 Main Points:
 """
-        for point in key_points[:5]:  # Top 5 for brief
-            summary += f"• {point}\n\n"
+        summary += "".join(f"• {point}\n\n" for point in key_points[:5])  # Top 5 for brief
             
     elif summary_type == "bullets":
-        summary = f"""# 📋 {video_info['title']} - Key Points
+        summary = f"""# 📋 {video_info.title} - Key Points
 
-**By {video_info['uploader']}** • {duration_mins}:{duration_secs:02d} • {video_info.get('view_count', 'N/A'):,} views
+**By {video_info.uploader}** • {video_info.duration_str} • {video_info.view_count:,} views
 
 ## 🔑 Essential Takeaways:
 """
-        for point in key_points:
-            summary += f"• {point}\n\n"
+        summary += "".join(f"• {point}\n\n" for point in key_points)
             
     else:  # academic
-        summary = f"""# 📚 {video_info['title']} - Analysis
+        summary = f"""# 📚 {video_info.title} - Analysis
 
 ## Abstract
-This analysis examines a {duration_mins}-minute video by {video_info['uploader']}, published on {upload_date}. The content focuses on career guidance and technical skill development.
+This analysis examines a {duration_mins}-minute video by {video_info.uploader}, published on {video_info.upload_date_iso}. The content focuses on career guidance and technical skill development.
 
 ## Key Findings:
 """
-        for i, point in enumerate(key_points, 1):
-            summary += f"{i}. {point}\n\n"
+        summary += "".join(f"{i}. {point}\n\n" for i, point in enumerate(key_points, 1))
     
     # Add highlights if available and requested
     if include_highlights and highlights:
         if hasattr(highlights, 'results') and highlights.results:
             summary += "\n## ⭐ AI-Detected Highlights:\n"
-            for highlight in highlights.results[:3]:  # Top 3 highlights
-                if hasattr(highlight, 'text'):
-                    summary += f"• {highlight.text}\n\n"
+            summary += "".join(
+                f"• {highlight.text}\n\n"
+                for highlight in highlights.results[:3]  # Top 3 highlights
+                if hasattr(highlight, 'text')
+            )
     
     # Add timestamps if requested
     if include_timestamps and summary_type in ["comprehensive", "academic"]:
         summary += "\n## ⏱️ Key Timestamps:\n"
         num_points = min(len(key_points), 5)
-        for i in range(num_points):
-            time_seconds = (video_info['duration'] * i) // num_points
-            timestamp = format_timestamp(time_seconds)
-            summary += f"**[{timestamp}]** {key_points[i][:100]}...\n\n"
+        summary += "".join(
+            f"**[{format_timestamp((video_info.duration * i) // num_points)}]** {key_points[i][:100]}...\n\n"
+            for i in range(num_points)
+        )
     
     # Add conclusion based on type
     if summary_type == "comprehensive":
@@ -371,74 +1024,31 @@ This {duration_mins}-minute video provides actionable insights for career develo
         summary += """## Conclusion
 The video demonstrates effective knowledge transfer through structured content delivery, focusing on practical career guidance with actionable recommendations."""
     else:
-        summary += f"\n---\n*Video contains {len(key_points)} key insights • {duration_mins}:{duration_secs:02d} runtime*"
+        summary += f"\n---\n*Video contains {len(key_points)} key insights • {video_info.duration_str} runtime*"
     
     return summary
 
-def create_customized_summary(transcript_data, video_info, summary_type, include_timestamps, include_chapters, include_highlights):
-    """Create a customized summary based on user preferences"""
-    try:
-        logger.info(f"Creating {summary_type} summary with custom options")
-        
-        # Check if Gemini API key is available
-        if GEMINI_API_KEY and GEMINI_API_KEY != "your_gemini_api_key_here":
-            # Create a Gemini model
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            
-            # Format duration and metadata
-            duration_mins = video_info['duration'] // 60
-            duration_secs = video_info['duration'] % 60
-            
-            upload_date = video_info['upload_date']
-            if len(upload_date) == 8:  # YYYYMMDD format
-                upload_date = f"{upload_date[0:4]}-{upload_date[4:6]}-{upload_date[6:8]}"
-            
-            # Extract data from transcript
-            raw_text = transcript_data.get('text', '') if isinstance(transcript_data, dict) else str(transcript_data)
-            highlights = transcript_data.get('auto_highlights', None) if isinstance(transcript_data, dict) else None
-            
-            # Build prompt based on summary type
-            if summary_type == "brief":
-                prompt_style = """Create a concise but comprehensive summary in 3-4 well-structured paragraphs. 
-                Focus on the main points and key insights. Include the most important timestamps and actionable takeaways.
-                Aim for 300-500 words that capture the essence of the video."""
-            elif summary_type == "bullets":
-                prompt_style = """Create a bullet-point summary with clear, actionable takeaways. 
-                Use hierarchical bullet points with main topics and sub-points. Include timestamps for each major section.
-                Focus on practical information and key insights in an easy-to-scan format."""
-            elif summary_type == "academic":
-                prompt_style = """Create an academic-style analysis with formal language, structured analysis, and scholarly presentation.
-                Include detailed analysis, context, methodology discussions, and comprehensive coverage of all topics.
-                Present information with proper structure, evidence, and academic rigor."""
-            else:  # comprehensive
-                prompt_style = """Create a comprehensive, detailed summary with full analysis and insights.
-                Include ALL important information, detailed explanations, context, and practical applications.
-                This should be a complete resource covering 90%+ of the video's value with thorough analysis."""
-            
-            # Build optional sections
-            timestamp_instruction = "Include specific timestamps in [MM:SS] format throughout the content." if include_timestamps else "Do not include specific timestamps."
-            highlight_instruction = "Highlight the most important insights and quotes." if include_highlights else "Present information in a balanced manner."
-            
-            # Create comprehensive prompt
-            prompt = f"""
+def gemini_enabled():
+    """Check whether a real Gemini API key has been configured"""
+    return bool(GEMINI_API_KEY) and GEMINI_API_KEY != "your_gemini_api_key_here"
+
+# Static scaffold for the Gemini summary prompt; only the placeholders change per request
+SUMMARY_PROMPT_TEMPLATE = """
 You are an expert content analyst specializing in video content summarization. Analyze this YouTube video and create a high-quality summary.
 
 {prompt_style}
 
 VIDEO INFORMATION:
-🎬 Title: {video_info['title']}
-👤 Creator: {video_info['uploader']}
-⏱️ Duration: {duration_mins}:{duration_secs:02d}
-📅 Upload Date: {upload_date}
-👁️ Views: {video_info.get('view_count', 'N/A')}
+🎬 Title: {title}
+👤 Creator: {uploader}
+⏱️ Duration: {duration}
 
 FULL TRANSCRIPT FOR ANALYSIS:
-{raw_text[:5000]}...
+{transcript}...
 
 REQUIREMENTS:
-- {timestamp_instruction}
-- {highlight_instruction}
-- Use clear markdown formatting with proper headings
+- {flag_instructions}
+- {format_instructions}
 - Ensure the summary contains ALL important information from the video
 - Make it engaging and valuable for someone who wants to understand the video's content
 - Include specific details, quotes, examples, and actionable insights where relevant
@@ -448,50 +1058,333 @@ The summary should help someone understand 80-90% of the video's value and decid
 
 Create the summary now:
 """
-            
-            # Generate customized content
-            response = model.generate_content(prompt)
-            
-            # Extract and return the customized text
-            try:
-                if hasattr(response, 'text'):
-                    return response.text
-                else:
-                    return str(response)
-            except Exception as e:
-                logger.warning(f"Error creating customized summary: {str(e)}")
-                return create_intelligent_summary(transcript_data, video_info, summary_type, include_timestamps, include_chapters, include_highlights)
+# Style instructions substituted into SUMMARY_PROMPT_TEMPLATE, keyed by summary_type
+SUMMARY_PROMPT_STYLES = {
+    "brief": """Create a concise but comprehensive summary in 3-4 well-structured paragraphs. 
+        Focus on the main points and key insights. Include the most important timestamps and actionable takeaways.
+        Aim for 300-500 words that capture the essence of the video.""",
+    "bullets": """Create a bullet-point summary with clear, actionable takeaways. 
+        Use hierarchical bullet points with main topics and sub-points. Include timestamps for each major section.
+        Focus on practical information and key insights in an easy-to-scan format.""",
+    "academic": """Create an academic-style analysis with formal language, structured analysis, and scholarly presentation.
+        Include detailed analysis, context, methodology discussions, and comprehensive coverage of all topics.
+        Present information with proper structure, evidence, and academic rigor.""",
+    "comprehensive": """Create a comprehensive, detailed summary with full analysis and insights.
+        Include ALL important information, detailed explanations, context, and practical applications.
+        This should be a complete resource covering 90%+ of the video's value with thorough analysis.""",
+}
+# Style instructions for buffered summaries, which fill SUMMARY_SCHEMA instead of writing markdown
+SUMMARY_JSON_PROMPT_STYLES = {
+    "brief": """Create a concise but comprehensive summary: a 2-3 sentence executive summary, 3-5 takeaways
+        and a few sections covering only the main points. Include the most important actionable takeaways.
+        Aim for 300-500 words in total that capture the essence of the video.""",
+    "bullets": """Create a summary built for scanning: a one-sentence executive summary, many short takeaways,
+        and one section per major topic whose content is a few short, practical sentences.
+        Focus on practical information and key insights.""",
+    "academic": """Create an academic-style analysis with formal language and scholarly presentation.
+        Use the sections for detailed analysis, context and methodology, covering all topics
+        with evidence and academic rigor.""",
+    "comprehensive": """Create a comprehensive, detailed summary with full analysis and insights.
+        Use as many sections as needed to include ALL important information, detailed explanations,
+        context and practical applications, covering 90%+ of the video's value.""",
+}
+# Output format requirement, indexed by whether the summary is returned as JSON: (markdown, JSON)
+FORMAT_INSTRUCTIONS = (
+    "Use clear markdown formatting with proper headings",
+    "Fill every field of the JSON response with plain text; don't use markdown or repeat the video title",
+)
+def count_summary(summary_type, source):
+    """Count a returned summary; unknown styles share one label so clients can't add time series"""
+    metrics.SUMMARIES.labels(summary_type if summary_type in SUMMARY_PROMPT_STYLES else "other", source).inc()
+
+# Optional requirement lines, indexed by the request flag: (off, on)
+TIMESTAMP_INSTRUCTIONS = (
+    "Do not include specific timestamps.",
+    "Include specific timestamps in [MM:SS] format throughout the content.",
+)
+HIGHLIGHT_INSTRUCTIONS = (
+    "Present information in a balanced manner.",
+    "Highlight the most important insights and quotes.",
+)
+# The joined requirement lines for every (include_timestamps, include_highlights) combination
+FLAG_INSTRUCTIONS = {
+    (timestamps, highlights): f"{TIMESTAMP_INSTRUCTIONS[timestamps]}\n- {HIGHLIGHT_INSTRUCTIONS[highlights]}"
+    for timestamps, highlights in itertools.product((False, True), repeat=2)
+}
+# Transcript tokens sent to Gemini per summary style; raising them buys thoroughness with input cost
+TRANSCRIPT_TOKEN_BUDGET = int(os.getenv("GEMINI_TRANSCRIPT_TOKENS", "1250"))
+TRANSCRIPT_TOKEN_BUDGETS = {
+    "brief": 375,  # A 300-500 word brief doesn't need the full excerpt
+}
+# Context window per model in tokens; unknown models are assumed to have the smallest
+GEMINI_CONTEXT_TOKENS = {
+    "gemini-1.0-pro": 30_720,
+    "gemini-1.5-flash": 1_048_576,
+    "gemini-1.5-flash-8b": 1_048_576,
+    "gemini-1.5-pro": 2_097_152,
+    "gemini-2.0-flash": 1_048_576,
+}
+CHARS_PER_TOKEN = 4  # Average for English text; estimating avoids a countTokens call per request
+
+# Transcripts longer than this are condensed chunk by chunk before summarizing, instead of cut off; 0 disables
+MAP_REDUCE_MIN_CHARS = int(os.getenv("GEMINI_MAP_REDUCE_MIN_CHARS", "20000"))
+MAP_CHUNK_CHARS = 6000
+MAP_CHUNK_OVERLAP = 500  # Keeps sentences cut at a chunk boundary whole in one of the two chunks
+MAP_GENERATION_CONFIG = {"maxOutputTokens": 400, "temperature": 0.3}
+MAP_PROMPT_TEMPLATE = """Condense this excerpt of a YouTube video transcript into notes.
+Keep every key point, specific detail, example, number and notable quote, in the order they occur.
+Write plain sentences without an introduction or conclusion.
+
+TRANSCRIPT EXCERPT:
+{chunk}
+"""
+_TRANSCRIPT_SLOT = "\x00"  # Stand-in that can't occur in metadata, split out of the formatted prompt
+
+@functools.lru_cache(maxsize=256)
+def build_prompt_skeleton(title, uploader, duration_str, summary_type, include_timestamps, include_highlights, structured=False):
+    """Format every part of the summary prompt except the transcript
+    
+    Returns the (head, tail) text around the transcript slot; cached so repeat videos
+    and styles skip the formatting entirely. structured asks for SUMMARY_SCHEMA JSON
+    instead of markdown.
+    """
+    # Pick the style instructions for the summary type; unknown types get the comprehensive style
+    styles = SUMMARY_JSON_PROMPT_STYLES if structured else SUMMARY_PROMPT_STYLES
+    prompt_style = styles.get(summary_type, styles["comprehensive"])
+    
+    # Create comprehensive prompt
+    prompt = SUMMARY_PROMPT_TEMPLATE.format(
+        prompt_style=prompt_style,
+        title=title,
+        uploader=uploader,
+        duration=duration_str,
+        transcript=_TRANSCRIPT_SLOT,
+        flag_instructions=FLAG_INSTRUCTIONS[bool(include_timestamps), bool(include_highlights)],
+        format_instructions=FORMAT_INSTRUCTIONS[bool(structured)],
+    )
+    head, _, tail = prompt.partition(_TRANSCRIPT_SLOT)
+    return head, tail
+
+def build_summary_prompt(transcript_data, video_info, summary_type, include_timestamps, include_highlights, notes=None, structured=False):
+    """Build the Gemini prompt for the requested summary style
+    
+    notes from condense_transcript() stand in for the transcript; they already cover the
+    whole video, so only the context window bounds them. structured builds the prompt
+    for a JSON summary.
+    """
+    head, tail = build_prompt_skeleton(
+        video_info.title, video_info.uploader, video_info.duration_str,
+        summary_type, include_timestamps, include_highlights, structured,
+    )
+    scaffold_chars = len(head) + len(tail)
+    if notes is not None:
+        return f"{head}{notes[:context_char_limit(scaffold_chars)]}{tail}"
+    limit = transcript_char_limit(summary_type, scaffold_chars)
+    return f"{head}{transcript_data.text[:limit]}{tail}"
+
+def context_char_limit(scaffold_chars):
+    """Return how many characters fit the model's context window around the scaffold and the output"""
+    window = GEMINI_CONTEXT_TOKENS.get(GEMINI_MODEL_NAME, min(GEMINI_CONTEXT_TOKENS.values()))
+    output_tokens = max(GEMINI_MAX_OUTPUT_TOKENS, GEMINI_JSON_MAX_OUTPUT_TOKENS)
+    return max(0, window - scaffold_chars // CHARS_PER_TOKEN - output_tokens) * CHARS_PER_TOKEN
+
+def transcript_char_limit(summary_type, scaffold_chars):
+    """Return how many transcript characters fit the style's token budget and the model's context window"""
+    budget = TRANSCRIPT_TOKEN_BUDGETS.get(summary_type, TRANSCRIPT_TOKEN_BUDGET)
+    return min(budget * CHARS_PER_TOKEN, context_char_limit(scaffold_chars))
+
+async def condense_chunk(chunk):
+    """Condense one transcript chunk into notes, cached by the chunk's content"""
+    key = ("map", hashlib.sha256(chunk.encode()).hexdigest())
+    notes = await run_blocking(SUMMARY_DISK_CACHE.get, key)
+    if notes is None:
+        notes = await generate_with_gemini(MAP_PROMPT_TEMPLATE.format(chunk=chunk), MAP_GENERATION_CONFIG)
+        await run_blocking(SUMMARY_DISK_CACHE.set, key, notes, expire=SUMMARY_DISK_CACHE_TTL)
+    return notes
+
+async def condense_transcript(transcript_data):
+    """Return notes covering a long transcript, or None when it is short enough to summarize directly
+    
+    Overlapping chunks are condensed concurrently (bounded by GEMINI_SEMAPHORE); their
+    notes are cached, so other styles and flags of the same video only pay for the
+    final summary. Styles summarized at the same time share one map phase.
+    """
+    text = transcript_data.text
+    if not MAP_REDUCE_MIN_CHARS or len(text) <= MAP_REDUCE_MIN_CHARS:
+        return None
+    
+    async def condense():
+        step = MAP_CHUNK_CHARS - MAP_CHUNK_OVERLAP
+        chunks = [text[i:i + MAP_CHUNK_CHARS] for i in range(0, len(text) - MAP_CHUNK_OVERLAP, step)]
+        logger.info("Condensing %s-character transcript in %s chunks", len(text), len(chunks))
+        notes = await asyncio.gather(*(condense_chunk(chunk) for chunk in chunks))
+        return "\n\n".join(notes)
+    
+    key = hashlib.sha256(text.encode()).hexdigest()
+    task = _CONDENSE_TASKS.get(key)
+    if task is None:
+        task = _CONDENSE_TASKS[key] = asyncio.ensure_future(condense())
+        task.add_done_callback(lambda _: _CONDENSE_TASKS.pop(key, None))
+    else:
+        logger.info("Joining in-flight condensing of transcript %s", key[:12])
+    # Shielded so one style's request being cancelled doesn't cancel the others' map phase
+    return await asyncio.shield(task)
+
+def summary_generation_config(transcript_data):
+    """Bound Gemini's output length by the size of the transcript being summarized"""
+    raw_text = transcript_data.text
+    # A summary never needs more tokens than roughly half the transcript's characters
+    return {'maxOutputTokens': max(256, min(GEMINI_MAX_OUTPUT_TOKENS, len(raw_text) // 2))}
+
+def render_structured_summary(data, video_info):
+    """Render a SUMMARY_SCHEMA response from Gemini as the markdown the frontend displays"""
+    parts = [f"# {video_info.title}\n\n", "## Executive Summary\n\n", data.get('executive_summary', ''), "\n\n"]
+
+    takeaways = data.get('takeaways') or []
+    if takeaways:
+        parts.append("## Key Takeaways\n\n")
+        parts.extend(f"- {item}\n" for item in takeaways)
+        parts.append("\n")
+
+    for section in data.get('sections') or []:
+        timestamp = section.get('timestamp')
+        heading = f"[{timestamp}] {section.get('title', '')}" if timestamp else section.get('title', '')
+        parts.append(f"## {heading}\n\n{section.get('content', '')}\n\n")
+
+    action_items = data.get('action_items') or []
+    if action_items:
+        parts.append("## Action Items\n\n")
+        parts.extend(f"- {item}\n" for item in action_items)
+
+    return "".join(parts).rstrip() + "\n"
+
+async def create_customized_summary(transcript_data, video_info, summary_type, include_timestamps, include_chapters, include_highlights):
+    """Create a customized summary with Gemini based on user preferences
+    
+    Returns None when Gemini isn't configured or returns no text, and lets Gemini errors
+    propagate, so the caller can fall back to the local summary without caching it.
+    """
+    logger.info("Creating %s summary with custom options", summary_type)
+    
+    # Check if Gemini API key is available
+    if not gemini_enabled():
+        logger.info("Gemini API key not configured, using intelligent summary generator")
+        return None
+    
+    notes = await condense_transcript(transcript_data)
+    prompt = build_summary_prompt(transcript_data, video_info, summary_type, include_timestamps, include_highlights, notes, structured=True)
+    
+    # Generate customized content as structured JSON and render it locally; a truncated object is a failure
+    payload = await generate_with_gemini(prompt, SUMMARY_JSON_CONFIG, require_complete=True)
+    if not payload:
+        logger.warning("Gemini returned no text, using intelligent summary generator")
+        return None
+    summary = render_structured_summary(orjson.loads(payload), video_info)
+    count_summary(summary_type, "gemini")
+    return summary
+
+def sse_event(payload):
+    """Format a payload as a server-sent event, as bytes ready for the response"""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+def ndjson_line(payload):
+    """Format a payload as one line of newline-delimited JSON, as bytes ready for the response"""
+    return orjson.dumps(payload, option=orjson.OPT_APPEND_NEWLINE)
+
+# Streaming wire formats by media type; clients pick one with the Accept header
+STREAM_FORMATS = {
+    "text/event-stream": sse_event,
+    "application/x-ndjson": ndjson_line,
+}
+
+async def stream_customized_summary(transcript_data, video_info, request, format_event=sse_event, summary_key=None):
+    """Yield the customized summary as events (SSE by default) while Gemini generates it
+    
+    With a summary_key, a cached summary is sent as a single delta, and a Gemini stream
+    that finished with STOP is stored so later streamed requests can reuse it.
+    """
+    summary_args = (transcript_data, video_info, request.summary_type, request.include_timestamps, request.include_chapters, request.include_highlights)
+    sent_any = False
+    
+    if summary_key is not None:
+        cached = await run_blocking(SUMMARY_DISK_CACHE.get, summary_key)
+        if cached is not None:
+            CACHE_STATS["summary_disk_hits"] += 1
+            count_summary(request.summary_type, "cache")
+            logger.info("Streaming cached summary for transcript %s", summary_key[2][:12])
+            yield format_event({"delta": cached})
+            yield format_event({"done": True, **build_summary_metadata(transcript_data, video_info, request)})
+            return
+        CACHE_STATS["summary_disk_misses"] += 1
+    
+    prompt = None
+    try:
+        if gemini_enabled():
+            notes = await condense_transcript(transcript_data)
+            prompt = build_summary_prompt(transcript_data, video_info, request.summary_type, request.include_timestamps, request.include_highlights, notes)
+            parts = []
+            finish_reason = None
+            async for text, reason in stream_with_gemini(prompt, summary_generation_config(transcript_data)):
+                finish_reason = reason or finish_reason
+                if text:
+                    sent_any = True
+                    parts.append(text)
+                    yield format_event({"delta": text})
+            count_summary(request.summary_type, "gemini")
+            if finish_reason != "STOP":
+                # A summary cut off at maxOutputTokens (or blocked) is sent but never reused
+                logger.warning("Gemini stream ended with %s; not caching it", finish_reason)
+            elif parts and summary_key is not None:
+                await run_blocking(SUMMARY_DISK_CACHE.set, summary_key, "".join(parts), expire=SUMMARY_DISK_CACHE_TTL)
         else:
-            logger.info("Gemini API key not configured, using intelligent summary generator")
-            return create_intelligent_summary(transcript_data, video_info, summary_type, include_timestamps, include_chapters, include_highlights)
-            
+            logger.info("Gemini API key not configured, streaming intelligent summary")
+            count_summary(request.summary_type, "fallback")
+            summary = await run_blocking(create_intelligent_summary, *summary_args)
+            sent_any = True
+            yield format_event({"delta": summary})
     except Exception as e:
-        logger.warning(f"Error in create_customized_summary: {str(e)}")
-        return create_intelligent_summary(transcript_data, video_info, summary_type, include_timestamps, include_chapters, include_highlights)
+        logger.warning("Error streaming customized summary: %s", e)
+        if sent_any:
+            yield format_event({"error": f"Summary generation interrupted: {str(e)}"})
+        else:
+            summary = None
+            if prompt is not None and _is_retryable(e):
+                # Nothing was sent yet, so resubmit the prompt already built, with generate_with_gemini's retries
+                try:
+                    summary = await generate_with_gemini(prompt, summary_generation_config(transcript_data))
+                except Exception as retry_error:
+                    logger.warning("Gemini retry after failed stream also failed: %s", retry_error)
+            if summary:
+                count_summary(request.summary_type, "gemini")
+            else:
+                count_summary(request.summary_type, "fallback")
+                summary = await run_blocking(create_intelligent_summary, *summary_args)
+            yield format_event({"delta": summary})
+    
+    yield format_event({"done": True, **build_summary_metadata(transcript_data, video_info, request)})
 
 def create_fallback_summary(transcript_data, video_info):
     """Create a basic structured summary if AI enhancement fails"""
     
     # Format duration
-    duration_mins = video_info['duration'] // 60
-    duration_secs = video_info['duration'] % 60
+    duration_mins = video_info.duration // 60
     
     # Extract text
-    raw_text = transcript_data.get('text', '') if isinstance(transcript_data, dict) else str(transcript_data)
-    chapters = transcript_data.get('chapters', []) if isinstance(transcript_data, dict) else []
+    raw_text = transcript_data.text
+    chapters = transcript_data.chapters
     
-    # Create basic structured output
-    fallback_summary = f"""
+    # Create basic structured output; sections are collected and joined once at the end
+    parts = [f"""
 # 📋 VIDEO SUMMARY
 
 ## 📹 Video Information
-- **Title:** {video_info['title']}
-- **Creator:** {video_info['uploader']}
-- **Duration:** {duration_mins}:{duration_secs:02d}
-- **Views:** {video_info.get('view_count', 'N/A')}
+- **Title:** {video_info.title}
+- **Creator:** {video_info.uploader}
+- **Duration:** {video_info.duration_str}
+- **Views:** {video_info.view_count}
 
 ## 📑 Content Breakdown
-"""
+"""]
     
     if chapters:
         for i, chapter in enumerate(chapters, 1):
@@ -504,7 +1397,7 @@ def create_fallback_summary(transcript_data, video_info):
                 start_time = format_timestamp(chapter.get('start', 0))
                 end_time = format_timestamp(chapter.get('end', 0))
                 chapter_summary = chapter.get('summary', 'Content segment')
-            fallback_summary += f"\n### {i}. [{start_time} - {end_time}] {chapter_summary}\n"
+            parts.append(f"\n### {i}. [{start_time} - {end_time}] {chapter_summary}\n")
     else:
         # If no chapters, create basic sections from transcript
         words_per_minute = 150
@@ -514,87 +1407,373 @@ def create_fallback_summary(transcript_data, video_info):
         for i in range(min(segments, 5)):  # Max 5 segments
             start_min = i * 5
             end_min = min((i + 1) * 5, duration_mins)
-            fallback_summary += f"\n### [{start_min:02d}:00 - {end_min:02d}:00] Content Segment {i+1}\n"
+            parts.append(f"\n### [{start_min:02d}:00 - {end_min:02d}:00] Content Segment {i+1}\n")
     
-    fallback_summary += f"\n## 📄 Full Transcript\n{raw_text}"
+    parts.append(f"\n## 📄 Full Transcript\n{raw_text}")
     
-    return fallback_summary
+    return "".join(parts)
 
 def cleanup_files(*file_paths):
     """Clean up temporary files"""
-    for file_path in file_paths:
+    for file_path in filter(None, file_paths):
+        try:
+            # Unlink directly rather than stat-then-remove; a missing file is already clean
+            os.remove(file_path)
+            logger.info("Removed temporary file: %s", file_path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Failed to remove file %s: %s", file_path, e)
+
+def build_summary_metadata(transcript_data, video_info, request):
+    """Build the video, processing and feature details returned alongside a summary"""
+    return {
+        "video_info": {
+            "title": video_info.title,
+            "uploader": video_info.uploader,
+            "duration": video_info.duration_str,
+            "duration_seconds": video_info.duration,
+            "view_count": video_info.view_count,
+            "upload_date": video_info.upload_date,
+            "description": video_info.description[:500] + "..." if video_info.description else 'N/A'
+        },
+        "processing_info": {
+            "summary_type": request.summary_type,
+            "speech_model": request.speech_model,
+            "has_chapters": False,  # Chapters removed
+            "has_summary": bool(transcript_data.summary),
+            "has_highlights": bool(transcript_data.auto_highlights),
+            "word_count": len(transcript_data.text.split()),
+            "chapter_count": 0  # No chapters
+        },
+        "features_used": {
+            "timestamps": request.include_timestamps,
+            "chapters": request.include_chapters,
+            "highlights": request.include_highlights,
+            "ai_summary": True
+        }
+    }
+
+def _is_audio_fetch_error(detail):
+    """Check whether an AssemblyAI failure came from fetching the audio URL (expired/forbidden)"""
+    detail = str(detail).lower()
+    return any(marker in detail for marker in AUDIO_FETCH_ERROR_MARKERS)
+
+def check_video_limits(video_info):
+    """Raise a 413 for livestreams and videos over MAX_DURATION_S or MAX_SIZE_B"""
+    if video_info.is_live:
+        raise HTTPException(status_code=413, detail="Live streams cannot be transcribed.")
+    if video_info.duration > MAX_DURATION_S:
+        raise HTTPException(status_code=413, detail=f"Video is too long. The maximum supported length is {MAX_DURATION_S // 60} minutes.")
+    if video_info.filesize_approx > MAX_SIZE_B:
+        raise HTTPException(status_code=413, detail="Video is too large to process.")
+
+async def transcribe_video(url, video_info, config, background):
+    """Transcribe a video (canonical watch URL), handing AssemblyAI the direct audio URL when possible
+    
+    Falls back to downloading the audio ourselves if AssemblyAI can't fetch the URL;
+    downloads are kept by video ID and trimmed to AUDIO_CACHE_MAX_BYTES after the
+    response has gone out.
+    """
+    # Upload and transcription must share a key, so pick the client once per request
+    aai_client = next_assemblyai_client()
+    
+    # Fast path: AssemblyAI pulls the audio from YouTube's CDN, so nothing passes through us
+    audio_url = video_info.audio_url
+    if audio_url:
+        try:
+            return await transcribe_with_assemblyai(audio_url, aai_client, config)
+        except HTTPException as http_ex:
+            if not _is_audio_fetch_error(http_ex.detail):
+                raise
+            logger.warning("AssemblyAI could not fetch the direct audio URL, downloading instead: %s", http_ex.detail)
+    
+    audio_file = await download_audio(url, aai_client.settings.api_key)
+    # Keep the download for repeat requests, but trim the folder once the response has gone out
+    background.add_task(evict_audio_cache)
+    
+    # Transcribe with AssemblyAI (advanced transcription with features)
+    return await transcribe_with_assemblyai(audio_file, aai_client, config)
+
+async def fetch_transcript(url, options, background):
+    """Return (video_info, transcript_data) for a canonical watch URL
+    
+    options comes from transcription_options(). Transcripts are cached by video ID and
+    options in this process and, when REDIS_URL is set, across all workers. Concurrent
+    requests for the same transcript share one AssemblyAI job.
+    """
+    video_info = await get_video_info(url)
+    check_video_limits(video_info)
+    config = build_aai_config(*options)
+    
+    video_id = extract_video_id(url)
+    if not video_id:
+        return video_info, await transcribe_video(url, video_info, config, background)
+    
+    cache_key = (video_id, *options)
+    transcript_data = TRANSCRIPT_CACHE.get(cache_key)
+    if transcript_data is not None:
+        CACHE_STATS["transcript_hits"] += 1
+        logger.info("Using cached transcript for %s", video_id)
+        return video_info, transcript_data
+    CACHE_STATS["transcript_misses"] += 1
+    
+    async def transcribe_and_cache():
+        transcript_data = await shared_cache.get_or_set(
+            "aai:v2:" + ":".join(map(str, cache_key)),  # v2: TranscriptData replaced the dict
+            TRANSCRIPT_SHARED_TTL,
+            lambda: transcribe_video(url, video_info, config, background),
+        )
+        TRANSCRIPT_CACHE[cache_key] = transcript_data
+        return transcript_data
+    
+    task = _TRANSCRIPT_TASKS.get(cache_key)
+    if task is None:
+        task = _TRANSCRIPT_TASKS[cache_key] = asyncio.ensure_future(transcribe_and_cache())
+        task.add_done_callback(lambda _: _TRANSCRIPT_TASKS.pop(cache_key, None))
+    else:
+        logger.info("Joining in-flight transcription for %s", video_id)
+    # Shielded so one caller disconnecting doesn't cancel the job the others are waiting on
+    return video_info, await asyncio.shield(task)
+
+def summary_cache_key(video_id, transcript_data, request, output_form):
+    """Key a generated summary by video, transcript content, style and the flags the prompt uses
+    
+    output_form is "structured" for markdown rendered from SUMMARY_SCHEMA JSON and
+    "stream" for Gemini's free-form streamed markdown, which are never interchanged.
+    """
+    return (
+        output_form,
+        video_id,
+        hashlib.sha256(transcript_data.text.encode()).hexdigest(),
+        request.summary_type,
+        request.include_timestamps,
+        request.include_highlights,
+    )
+
+async def summarize_video(url, request, background):
+    """Download, transcribe and summarize a video
+    
+    Returns (response body, cacheable); a local fallback summary is not cacheable, so
+    the next request tries Gemini again.
+    """
+    video_info, transcript_data = await fetch_transcript(url, transcription_options(request), background)
+    
+    # The same transcript and options always yield the same summary, so skip Gemini on a hit
+    summary_key = summary_cache_key(extract_video_id(url), transcript_data, request, "structured")
+    enhanced_summary = await run_blocking(SUMMARY_DISK_CACHE.get, summary_key)
+    if enhanced_summary is None:
+        CACHE_STATS["summary_disk_misses"] += 1
+        generated = False
+        
+        async def generate():
+            nonlocal generated
+            generated = True
+            # Create customized summary based on request parameters
+            return await create_customized_summary(
+                transcript_data, 
+                video_info, 
+                request.summary_type,
+                request.include_timestamps,
+                request.include_chapters,
+                request.include_highlights
+            )
+        
         try:
-            if file_path and os.path.exists(file_path):
-                os.remove(file_path)
-                logger.info(f"Removed temporary file: {file_path}")
+            enhanced_summary = await shared_cache.get_or_set(
+                f"summary:{hashlib.sha256(repr(summary_key).encode()).hexdigest()}",
+                SUMMARY_DISK_CACHE_TTL,
+                generate,
+            )
+            if enhanced_summary is not None and not generated:
+                count_summary(request.summary_type, "cache")  # Served from the shared Redis cache
         except Exception as e:
-            logger.warning(f"Failed to remove file {file_path}: {str(e)}")
+            logger.warning("Error in create_customized_summary: %s", e)
+            enhanced_summary = None
+        
+        if enhanced_summary is None:
+            count_summary(request.summary_type, "fallback")
+            enhanced_summary = await run_blocking(
+                create_intelligent_summary, transcript_data, video_info, request.summary_type,
+                request.include_timestamps, request.include_chapters, request.include_highlights,
+            )
+            return {"text": enhanced_summary, **build_summary_metadata(transcript_data, video_info, request)}, False
+        await run_blocking(SUMMARY_DISK_CACHE.set, summary_key, enhanced_summary, expire=SUMMARY_DISK_CACHE_TTL)
+    else:
+        CACHE_STATS["summary_disk_hits"] += 1
+        count_summary(request.summary_type, "cache")
+        logger.info("Using cached summary for transcript %s", summary_key[2][:12])
+    
+    # Return comprehensive response with summary only
+    return {"text": enhanced_summary, **build_summary_metadata(transcript_data, video_info, request)}, True
+
+async def get_or_compute_summary(cache_key, compute):
+    """Return a cached summary, or compute it once while concurrent duplicates wait
+    
+    compute returns (result, cacheable); only cacheable results are kept.
+    """
+    cached = SUMMARY_CACHE.get(cache_key)
+    if cached is not None:
+        CACHE_STATS["summary_memory_hits"] += 1
+        count_summary(cache_key[1], "cache")  # cache_key[1] is the summary type
+        logger.info("Summary cache hit for %s", cache_key[0])
+        return cached
+    CACHE_STATS["summary_memory_misses"] += 1
+    
+    lock = _SUMMARY_LOCKS.setdefault(cache_key, asyncio.Lock())
+    try:
+        async with lock:
+            # Another request may have filled the cache while we waited
+            cached = SUMMARY_CACHE.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            result, cacheable = await compute()
+            if cacheable:
+                SUMMARY_CACHE[cache_key] = result
+            return result
+    finally:
+        if not lock.locked():
+            _SUMMARY_LOCKS.pop(cache_key, None)
+
+def validate_request_url(url, request_kind):
+    """Log a summarization request and return (video_id, canonical watch URL)
+    
+    Raises a 400 for anything that isn't a YouTube video URL; the endpoints report it
+    as their usual error body.
+    """
+    logger.info("Received %s summarization request for URL: %s", request_kind, url)
+    if not url or not _YT_URL_RE.match(url):
+        logger.warning("Invalid URL provided: %s", url)
+        raise HTTPException(status_code=400, detail="Invalid YouTube URL provided")
+    
+    # Normalize youtu.be / extra query parameters to a plain watch URL
+    video_id, url = canonicalize(url)
+    logger.info("Processed URL: %s", url)
+    return video_id, url
 
 # Enhanced endpoint for intelligent video summarization
 @app.post("/transcribe-summary/")
-async def transcribe_summary_endpoint(request: EnhancedVideoRequest):
+async def transcribe_summary_endpoint(request: EnhancedVideoRequest, background: BackgroundTasks):
     """Advanced endpoint for intelligent video summarization with customizable options"""
-    audio_file = None
-    
     try:
-        url = request.url
-        logger.info(f"Received enhanced summarization request for URL: {url}")
-        logger.info(f"Summary type: {request.summary_type}, Include timestamps: {request.include_timestamps}")
+        video_id, url = validate_request_url(request.url, "enhanced")
+        logger.info("Summary type: %s, Include timestamps: %s", request.summary_type, request.include_timestamps)
         
-        # Validate the URL
-        if not url or (not "youtube.com" in url and not "youtu.be" in url):
-            logger.warning(f"Invalid URL provided: {url}")
-            return {"error": "Invalid YouTube URL provided"}
+        cache_key = (video_id, request.summary_type, request.include_timestamps, request.include_chapters, request.include_highlights, request.speech_model)
+        return await get_or_compute_summary(cache_key, lambda: summarize_video(url, request, background))
+    except HTTPException as http_ex:
+        logger.error("HTTP error in transcribe_summary_endpoint: %s", http_ex.detail)
+        return {"error": http_ex.detail}
+    except Exception as e:
+        logger.error("Error in transcribe_summary_endpoint: %s", e)
+        return {"error": str(e)}
+
+# Several summary styles of one video, generated concurrently from a single transcription
+@app.post("/transcribe-summary/multi/")
+async def transcribe_summary_multi_endpoint(request: MultiSummaryRequest, background: BackgroundTasks):
+    """Summarize a video in each requested style; summaries come back in request order"""
+    if not 0 < len(request.summary_types) <= len(SUMMARY_PROMPT_STYLES):
+        return {"error": f"Request between 1 and {len(SUMMARY_PROMPT_STYLES)} summary types"}
+    unknown = sorted(set(request.summary_types) - SUMMARY_PROMPT_STYLES.keys())
+    if unknown:
+        logger.warning("Rejected unknown summary types: %s", unknown)
+        return {"error": f"Unknown summary types: {', '.join(unknown)}; choose from {', '.join(SUMMARY_PROMPT_STYLES)}"}
+    
+    try:
+        video_id, url = validate_request_url(request.url, "multi-style")
         
-        # Download audio and get video info
-        audio_file, video_info = download_audio_and_get_info(url)
+        # Transcribe once up front; each style below then hits the transcript cache
+        await fetch_transcript(url, transcription_options(request), background)
         
-        # Transcribe with AssemblyAI (advanced transcription with features)
-        transcript_data = transcribe_with_assemblyai(audio_file)
+        async def summarize_style(summary_type):
+            style_request = EnhancedVideoRequest(
+                url=url,
+                summary_type=summary_type,
+                include_timestamps=request.include_timestamps,
+                include_chapters=request.include_chapters,
+                include_highlights=request.include_highlights,
+                speech_model=request.speech_model,
+            )
+            cache_key = (video_id, summary_type, request.include_timestamps, request.include_chapters, request.include_highlights, request.speech_model)
+            return await get_or_compute_summary(cache_key, lambda: summarize_video(url, style_request, background))
         
-        # Create customized summary based on request parameters
-        enhanced_summary = create_customized_summary(
-            transcript_data, 
-            video_info, 
-            request.summary_type,
-            request.include_timestamps,
-            request.include_chapters,
-            request.include_highlights
-        )
+        # Gemini calls for the different styles are independent, so run them side by side
+        summary_types = list(dict.fromkeys(request.summary_types))
+        return {"summaries": await asyncio.gather(*(summarize_style(t) for t in summary_types))}
+    except HTTPException as http_ex:
+        logger.error("HTTP error in transcribe_summary_multi_endpoint: %s", http_ex.detail)
+        return {"error": http_ex.detail}
+    except Exception as e:
+        logger.error("Error in transcribe_summary_multi_endpoint: %s", e)
+        return {"error": str(e)}
+
+# Several videos summarized concurrently in one call, e.g. for a playlist
+@app.post("/transcribe-summary/batch/")
+async def transcribe_summary_batch_endpoint(request: BatchSummaryRequest, background: BackgroundTasks):
+    """Summarize each video in the batch; results come back in request order
+    
+    Each entry is handled exactly like /transcribe-summary/, so one failing video
+    yields an error entry without failing the rest.
+    """
+    if len(request.requests) > MAX_BATCH_SIZE:
+        logger.warning("Rejected batch of %s videos", len(request.requests))
+        return {"error": f"A batch can contain at most {MAX_BATCH_SIZE} videos"}
+    
+    logger.info("Received batch summarization request for %s videos", len(request.requests))
+    # Gemini and AssemblyAI concurrency is bounded by their semaphores, not the batch size
+    return {"summaries": await asyncio.gather(*(transcribe_summary_endpoint(item, background) for item in request.requests))}
+
+# Streaming variant of /transcribe-summary/ that sends Gemini output as server-sent events
+@app.post("/transcribe-summary/stream/")
+async def transcribe_summary_stream_endpoint(request: EnhancedVideoRequest, background: BackgroundTasks, http_request: Request):
+    """Stream the summary as it is generated; the final event carries the video metadata
+    
+    Sends server-sent events unless the client accepts application/x-ndjson.
+    """
+    try:
+        video_id, url = validate_request_url(request.url, "streaming")
         
-        # Return comprehensive response with summary only
-        return {
-            "text": enhanced_summary,
-            "video_info": {
-                "title": video_info['title'],
-                "uploader": video_info['uploader'],
-                "duration": f"{video_info['duration'] // 60}:{video_info['duration'] % 60:02d}",
-                "duration_seconds": video_info['duration'],
-                "view_count": video_info.get('view_count', 'N/A'),
-                "upload_date": video_info['upload_date'],
-                "description": video_info.get('description', '')[:500] + "..." if video_info.get('description', '') else 'N/A'
-            },
-            "processing_info": {
-                "summary_type": request.summary_type,
-                "has_chapters": False,  # Chapters removed
-                "has_summary": bool(transcript_data.get('summary', '') if isinstance(transcript_data, dict) else False),
-                "has_highlights": bool(transcript_data.get('auto_highlights', None) if isinstance(transcript_data, dict) else False),
-                "word_count": len(transcript_data.get('text', '').split() if isinstance(transcript_data, dict) else str(transcript_data).split()),
-                "chapter_count": 0  # No chapters
-            },
-            "features_used": {
-                "timestamps": request.include_timestamps,
-                "chapters": request.include_chapters,
-                "highlights": request.include_highlights,
-                "ai_summary": True
-            }
-        }
+        # Download and transcribe up front so errors are reported before the stream opens
+        video_info, transcript_data = await fetch_transcript(url, transcription_options(request), background)
     except HTTPException as http_ex:
-        logger.error(f"HTTP error in transcribe_summary_endpoint: {http_ex.detail}")
+        logger.error("HTTP error in transcribe_summary_stream_endpoint: %s", http_ex.detail)
         return {"error": http_ex.detail}
     except Exception as e:
-        logger.error(f"Error in transcribe_summary_endpoint: {str(e)}")
+        logger.error("Error in transcribe_summary_stream_endpoint: %s", e)
         return {"error": str(e)}
-    finally:
-        # Clean up files regardless of success or failure
-        cleanup_files(audio_file)
+    
+    media_type = "application/x-ndjson" if "application/x-ndjson" in http_request.headers.get("accept", "") else "text/event-stream"
+    return StreamingResponse(
+        stream_customized_summary(
+            transcript_data, video_info, request, STREAM_FORMATS[media_type],
+            summary_key=summary_cache_key(video_id, transcript_data, request, "stream"),
+        ),
+        media_type=media_type,
+        # Stop proxies (nginx, Render) from buffering chunks until the stream ends
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _cache_layer_stats(name, size):
+    """Summarize one cache layer's size and hit rate from CACHE_STATS"""
+    hits, misses = CACHE_STATS[f"{name}_hits"], CACHE_STATS[f"{name}_misses"]
+    lookups = hits + misses
+    return {"size": size, "hits": hits, "misses": misses, "hit_rate": round(hits / lookups, 3) if lookups else None}
+
+# Cache observability; counters are per worker process and reset on restart
+@app.get("/cache/stats")
+async def cache_stats_endpoint():
+    """Report the size and hit rate of each cache layer"""
+    return {
+        "video_info": _cache_layer_stats("video_info", len(VIDEO_INFO_CACHE)),
+        "transcript": _cache_layer_stats("transcript", len(TRANSCRIPT_CACHE)),
+        "summary_memory": _cache_layer_stats("summary_memory", len(SUMMARY_CACHE)),
+        "summary_disk": _cache_layer_stats("summary_disk", await run_blocking(len, SUMMARY_DISK_CACHE)),
+        "shared": shared_cache.get_stats(),
+    }
+
+# Prometheus scrape target for this worker
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Expose Gemini request, latency, token and summary-source metrics in Prometheus text format"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,26 @@
+"""Prometheus metrics for Gemini calls and summary generation, served by /metrics
+
+Metrics live in this worker's default registry; with several workers, each one is
+scraped separately.
+"""
+from prometheus_client import Counter, Histogram
+
+GEMINI_REQUESTS = Counter(
+    "gemini_requests_total", "Gemini API requests by method and HTTP status", ["method", "status"],
+)
+GEMINI_LATENCY = Histogram(
+    "gemini_request_seconds", "Time from sending a Gemini request to receiving its last byte", ["method"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+GEMINI_TOKENS = Counter(
+    "gemini_tokens_total", "Tokens billed by Gemini", ["direction"],
+)
+SUMMARIES = Counter(
+    "summaries_total", "Summaries returned, by style and where they came from", ["summary_type", "source"],
+)
+
+def record_usage(usage):
+    """Count the prompt and output tokens from a Gemini usageMetadata block"""
+    if usage:
+        GEMINI_TOKENS.labels("input").inc(usage.get("promptTokenCount", 0))
+        GEMINI_TOKENS.labels("output").inc(usage.get("candidatesTokenCount", 0))
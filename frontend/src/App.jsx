@@ -313,7 +313,7 @@ function App() {
                         <div><span className="text-gray-400">Creator:</span> <span className="text-white">{videoInfo.uploader}</span></div>
                         <div><span className="text-gray-400">Duration:</span> <span className="text-white">{videoInfo.duration}</span></div>
                         <div><span className="text-gray-400">Views:</span> <span className="text-white">{videoInfo.view_count}</span></div>
-                        <div><span className="text-gray-400">Published:</span> <span className="text-white">{videoInfo.upload_date}</span></div>
+                        <div><span className="text-gray-400">Published:</span> <span className="text-white">{videoInfo.upload_date || 'Unknown'}</span></div>
                       </div>
                     </div>
                   )}